@@ -0,0 +1,342 @@
+"""
+AI Nexus 引擎离线基准测试
+
+在本地起一个夹具服务器，模拟 Product Hunt feed、HN Firebase API 和各种文章页面
+(从几百字节到数 MB，以及畸形页面、二进制文件、慢响应和 404)，再用可配置延迟的
+桩翻译器完整跑一遍 run_spider -> make_ranks -> make_prompts -> save -> save_split。
+每一遍在独立子进程中运行，峰值内存 (peak RSS) 只统计引擎本身。
+
+用法:
+    python bench.py                      # 冷缓存 + 热缓存各跑一次
+    python bench.py --latency-ms 50 --trans-latency-ms 200 --runs 3
+    python bench.py --fixtures recorded/ # 优先使用录制好的夹具文件
+
+结果追加到 .bench/results.jsonl (带 git 提交号)，并与上一次同配置的结果对比。
+"""
+import argparse
+import contextlib
+import datetime
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+import engine
+
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bench", "results.jsonl")
+KEYWORDS = ["Show HN", "Launch", "Tool", "App", "Open Source", "GPT", "LLM"]
+PARAGRAPH = "<p>This paragraph is long enough to be picked up as the article summary by the body text fallback path.</p>"
+
+# === 1. 夹具生成 ===
+SYLLABLES = ["ka", "lo", "mi", "rev", "tor", "zen", "qua", "dex", "vi", "sol", "nar", "bex"]
+
+def product_name(i):
+    """确定性的伪造产品名，保证不同条目的标题互不相似"""
+    return "".join(SYLLABLES[(i * 7 + k * 5) % len(SYLLABLES)] for k in range(3)).capitalize() + str(i)
+
+def page_fixture(kind, n):
+    """按类型生成文章页面，返回 (Content-Type, 正文字节)"""
+    head = f"<html><head><title>Article {n}</title>"
+    if kind == "og":
+        return "text/html; charset=utf-8", (head + f'<meta property="og:description" content="Open graph description for article {n}, long enough."></head><body>{PARAGRAPH}</body></html>').encode()
+    if kind == "meta":
+        return "text/html; charset=utf-8", (head + f'<meta name="description" content="Meta description for article {n}, long enough to use."></head><body>{PARAGRAPH}</body></html>').encode()
+    if kind == "tiny":
+        return "text/html", f"<html><body>hi {n}</body></html>".encode()
+    if kind == "body":
+        return "text/html; charset=utf-8", (head + "</head><body>" + "<script>var a = '<p>not this</p>';</script>" + PARAGRAPH + "</body></html>").encode()
+    if kind == "large":
+        # 2 MB 噪音后才出现正文段落
+        filler = "<div class='x'><span>noise</span></div>\n" * 52000
+        return "text/html; charset=utf-8", (head + "</head><body>" + filler + PARAGRAPH + "</body></html>").encode()
+    if kind == "huge":
+        filler = "<p>short</p>\n" * 700000
+        return "text/html; charset=utf-8", (head + "</head><body>" + filler + "</body></html>").encode()
+    if kind == "pathological":
+        # 未闭合的标签、注释和 script，对懒惰正则和回扫都不友好
+        return "text/html", (head + "<body><p" + " data-x='1'" * 150000 + "<!-- " + "<script>" * 20000).encode()
+    if kind == "binary":
+        return "application/octet-stream", bytes(range(256)) * 8192
+    return "text/html", b""
+
+PAGE_KINDS = ["og", "meta", "tiny", "body", "large", "huge", "pathological", "binary", "slow", "missing"]
+
+class Fixtures:
+    """合成夹具，若指定 fixtures 目录则其中同路径的文件优先"""
+    def __init__(self, base, root=None, entries=20, stories=80):
+        self.base = base
+        self.root = root
+        self.entries = entries
+        self.stories = stories
+        self.pages = {}
+        self.lock = threading.Lock()
+        self.kinds_requested = set()  # 用于检查每种页面类型都被请求过
+
+    def recorded(self, path):
+        if not self.root: return None
+        fp = os.path.join(self.root, path.lstrip("/").replace("/", os.sep))
+        if os.path.isfile(fp):
+            with open(fp, "rb") as f: return f.read()
+        return None
+
+    def resolve(self, path):
+        """返回 (状态码, Content-Type, 正文, 额外延迟秒数)"""
+        body = self.recorded(path)
+        if body is not None:
+            ctype = "application/json" if path.endswith(".json") else "application/atom+xml" if path.startswith("/feed") else "text/html"
+            return 200, ctype, body, 0
+        if path.startswith("/feed"):
+            return 200, "application/atom+xml", self.feed(), 0
+        if path == "/v0/topstories.json":
+            return 200, "application/json", json.dumps(list(range(1000, 1000 + self.stories))).encode(), 0
+        if path.startswith("/v0/item/"):
+            i = int(path.rsplit("/", 1)[1].split(".")[0])
+            # 只有偶数 id 带关键词会被选中，按选中序号 j 轮换页面类型；每 10 条错开一位，
+            # 避免被近似去重丢弃的那几条 (i % 20 == 4) 总是同一种类型
+            j = (i - 1000) // 2
+            kind = PAGE_KINDS[(j + j // len(PAGE_KINDS)) % len(PAGE_KINDS)]
+            title = f"{KEYWORDS[i % len(KEYWORDS)]}: {product_name(i)} for everyday work" if i % 2 == 0 else f"Unrelated story {i}"
+            if i % 20 == 4:
+                # 与 Product Hunt 同一产品换个说法，用于触发近似去重
+                title = f"Show HN: {product_name(i % self.entries)}, an open source app"
+            item = {"id": i, "title": title, "time": 1760000000 + i, "url": f"{self.base}/page/{kind}/{i}"}
+            return 200, "application/json", json.dumps(item).encode(), 0
+        if path.startswith("/page/"):
+            _, _, kind, n = path.split("/", 3)
+            with self.lock: self.kinds_requested.add(kind)
+            if kind == "missing": return 404, "text/html", b"not found", 0
+            if kind == "slow": return 200, *page_fixture("og", n), 0.5
+            key = (kind, n)
+            if key not in self.pages: self.pages[key] = page_fixture(kind, n)
+            return 200, *self.pages[key], 0
+        return 404, "text/plain", b"", 0
+
+    def feed(self):
+        rows = []
+        for i in range(self.entries):
+            # 只有摘要过短的条目才会去深挖页面，这些条目按自身序号轮换页面类型
+            short = i % 3 == 0
+            summary = "short" if short else f"Product number {i} does something useful with large language models."
+            kind = PAGE_KINDS[(i // 3) % len(PAGE_KINDS)] if short else "og"
+            rows.append(f"<entry><title>{product_name(i)} – open-source app</title><summary>{summary}</summary>"
+                        f"<link href=\"{self.base}/page/{kind}/p{i}\"/><published>2026-10-17T10:00:00-07:00</published></entry>")
+        return ('<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">' + "".join(rows) + "</feed>").encode()
+
+# === 2. 夹具服务器 ===
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 引擎读够内容后会主动断开连接，这是预期行为
+        if isinstance(sys.exc_info()[1], ConnectionError): return
+        super().handle_error(request, client_address)
+
+class FixtureServer:
+    def __init__(self, latency=0.0, fixtures_dir=None):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args): pass
+
+            def do_GET(self):
+                status, ctype, body, delay = server.fixtures.resolve(self.path.split("?", 1)[0])
+                time.sleep(server.latency + delay)
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+                with server.lock: server.requests += 1
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    with server.lock: server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 200: self.send_header("ETag", etag)
+                self.end_headers()
+                # 分块写出，客户端提前断开时只统计实际发出的字节
+                for i in range(0, len(body), 64 * 1024):
+                    try: self.wfile.write(body[i:i + 64 * 1024])
+                    except (BrokenPipeError, ConnectionResetError):
+                        self.close_connection = True
+                        break
+                    with server.lock: server.bytes_sent += len(body[i:i + 64 * 1024])
+
+        self.httpd = QuietServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.fixtures = Fixtures(self.base, fixtures_dir)
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def snapshot(self):
+        with self.lock: return {"requests": self.requests, "not_modified": self.not_modified, "bytes": self.bytes_sent}
+
+# === 3. 桩翻译器 ===
+class StubTranslator:
+    """模拟翻译接口：每次调用固定延迟，按行加前缀，方便验证批量拆分"""
+    calls = 0
+    lock = threading.Lock()
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def translate(self, text):
+        with StubTranslator.lock: StubTranslator.calls += 1
+        time.sleep(self.latency)
+        return "\n".join("译:" + line for line in text.split("\n"))
+
+# === 4. 运行与统计 ===
+def peak_rss_mb():
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def engine_pass(args, base, workdir, queue):
+    """在子进程里跑一遍引擎：峰值内存只属于这一遍，不含夹具服务器和之前几遍"""
+    engine.PH_FEED_URL = f"{base}/feed/category/artificial-intelligence"
+    engine.HN_API_BASE = f"{base}/v0"
+    engine.HN_ITEM_PAGE = f"{base}/page/missing/hn"
+    os.chdir(workdir)  # 缓存与输出文件全部落在临时目录，各遍之间共享
+    StubTranslator.calls = 0
+    stages = {}
+
+    def timed(name, fn):
+        t = time.perf_counter()
+        fn()
+        stages[name] = round(time.perf_counter() - t, 4)
+
+    out = io.StringIO()
+    redirect = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(out)
+    start = time.perf_counter()
+    with redirect:
+        e = engine.DataEngine(workers=args.workers, incremental=args.incremental, metrics=True,
+                              translator_factory=lambda: StubTranslator(args.trans_latency_ms / 1000))
+        timed("run_spider", e.run_spider)
+        timed("make_ranks", e.make_ranks)
+        timed("make_prompts", e.make_prompts)
+        timed("save", e.save)
+        timed("save_split", e.save_split)
+    wall = round(time.perf_counter() - start, 4)
+    queue.put({
+        "wall": wall,
+        "stages": stages,
+        "translator_calls": StubTranslator.calls,
+        "news": len(e.news),
+        "peak_rss_mb": peak_rss_mb(),
+        "metrics": e.metrics.report(),  # 引擎内部的细分耗时与事件计数
+    })
+
+def run_once(server, args, workdir):
+    before = server.snapshot()
+    # spawn 而不是 fork：fork 出的子进程会继承父进程 (含夹具页面) 的内存
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=engine_pass, args=(args, server.base, workdir, queue))
+    proc.start()
+    try:
+        while True:
+            try:
+                res = queue.get(timeout=1)
+                break
+            except queue_module.Empty:
+                # 子进程异常退出时不会再有结果，别一直等
+                if not proc.is_alive(): raise RuntimeError(f"引擎子进程异常退出 (exit code {proc.exitcode})")
+    finally: proc.join()
+    after = server.snapshot()
+    res.update({
+        "requests": after["requests"] - before["requests"],
+        "not_modified": after["not_modified"] - before["not_modified"],
+        "bytes": after["bytes"] - before["bytes"],
+    })
+    return res
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError: return None
+
+def load_previous(config):
+    try:
+        with open(RESULTS_FILE, "r", encoding="utf-8") as f: rows = [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError): return None
+    same = [r for r in rows if r.get("config") == config]
+    return same[-1] if same else None
+
+def print_run(label, res, prev=None):
+    def delta(key, value, base):
+        if not base or base.get(key) in (None, 0): return ""
+        return f" ({(value - base[key]) / base[key]:+.0%})"
+    print(f"[{label}] wall {res['wall']:.2f}s{delta('wall', res['wall'], prev)}  "
+          f"requests {res['requests']} (304: {res['not_modified']})  "
+          f"bytes {res['bytes'] / 1024:.0f} KB{delta('bytes', res['bytes'], prev)}  "
+          f"translator calls {res['translator_calls']}  news {res['news']}  peak RSS {res['peak_rss_mb']} MB")
+    print("    " + "  ".join(f"{k} {v:.3f}s" for k, v in res["stages"].items()))
+    counters = res["metrics"]["counters"]
+    print("    " + "  ".join(f"{k} {v}" for k, v in counters.items() if k.startswith(("summary.", "fetch.", "http.", "page.", "filler"))))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI Nexus 引擎离线基准测试")
+    parser.add_argument("--runs", type=int, default=2, help="连续运行次数，第一次为冷缓存 (默认 2)")
+    parser.add_argument("--latency-ms", type=float, default=20, help="夹具服务器每个请求的额外延迟")
+    parser.add_argument("--trans-latency-ms", type=float, default=100, help="桩翻译器每次调用的延迟")
+    parser.add_argument("--workers", type=int, default=engine.MAX_WORKERS, help="引擎并发数")
+    parser.add_argument("--incremental", action="store_true", help="以增量模式运行引擎")
+    parser.add_argument("--fixtures", help="录制夹具目录，按 URL 路径存放 (如 v0/item/1000.json)")
+    parser.add_argument("--no-record", action="store_true", help="不写入结果文件")
+    parser.add_argument("--verbose", action="store_true", help="显示引擎自身的输出")
+    args = parser.parse_args(argv)
+
+    config = {k: getattr(args, k) for k in ("runs", "latency_ms", "trans_latency_ms", "workers", "incremental", "fixtures")}
+    prev = load_previous(config)
+    workdir = tempfile.mkdtemp(prefix="ai-nexus-bench-")
+    runs = []
+    with FixtureServer(args.latency_ms / 1000, args.fixtures and os.path.abspath(args.fixtures)) as server:
+        try:
+            for n in range(args.runs):
+                res = run_once(server, args, workdir)
+                runs.append(res)
+                print_run("cold" if n == 0 else f"warm{n}", res, prev["runs"][n] if prev and n < len(prev["runs"]) else None)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        missing = [k for k in PAGE_KINDS if k not in server.fixtures.kinds_requested]
+        if missing: print(f"⚠️ 以下页面类型一次也没有被请求，基准未覆盖: {', '.join(missing)}")
+
+    if not args.no_record:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        row = {"commit": git_commit(), "date": datetime.datetime.now().isoformat(timespec="seconds"),
+               "python": sys.version.split()[0], "config": config, "runs": runs}
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f: f.write(json.dumps(row) + "\n")
+        print(f"结果已写入 {RESULTS_FILE}" + (f" (对比提交 {prev['commit']})" if prev else ""))
+
+if __name__ == "__main__":
+    main()
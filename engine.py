@@ -1,33 +1,63 @@
 import os
 import sys
 import time
+import codecs
 import datetime
+import gzip
+import hashlib
+import argparse
 import json
 import random
 import re
+import sqlite3
+import threading
 import traceback
+from functools import cached_property
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urlparse
 
-print("🔄 正在初始化 AI Nexus 引擎 (内容深度增强版)...")
-
-# === 1. 依赖检查 ===
-try:
-    import requests
-    import urllib3
-    import xml.etree.ElementTree as ET
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-except ImportError:
-    print("\n❌ 严重错误：缺少 requests 库。")
-    sys.exit()
-
-# === 2. 翻译检查 ===
-try:
-    from deep_translator import GoogleTranslator
-    translator = GoogleTranslator(source='auto', target='zh-CN')
-    TRANSLATE_AVAILABLE = True
-    print("✅ 翻译服务: 在线智能翻译")
-except:
-    TRANSLATE_AVAILABLE = False
-    print("⚠️ 翻译服务: 使用本地词典模式")
+# 网络库、翻译库和 brotli 都在第一次用到时才导入：
+# 只做离线重建 / 生成榜单时，导入本模块不会加载任何网络相关依赖。
+
+# === 1. 依赖检查 (延迟) ===
+_requests = None
+
+def load_requests():
+    """首次联网时导入 requests，并关闭 verify=False 带来的证书警告"""
+    global _requests
+    if _requests is None:
+        try:
+            import requests
+            import urllib3
+        except ImportError:
+            raise RuntimeError("缺少 requests 库，请先执行 pip install requests")
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        _requests = requests
+    return _requests
+
+def load_brotli():
+    """brotli 为可选依赖，没装时只生成 .gz"""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+# === 2. 翻译检查 (延迟) ===
+_translator_backend = None  # None: 尚未检查；False: 不可用
+
+def default_translator_factory():
+    """第一次需要翻译时才导入 deep_translator；不可用时返回 None，保留原文"""
+    global _translator_backend
+    if _translator_backend is None:
+        try:
+            from deep_translator import GoogleTranslator
+            _translator_backend = lambda: GoogleTranslator(source='auto', target='zh-CN')
+            print("✅ 翻译服务: 在线智能翻译")
+        except Exception:
+            _translator_backend = False
+            print("⚠️ 翻译服务: 使用本地词典模式")
+    return _translator_backend or None
 
 # === 3. 全局配置 ===
 DATA_FILE = "data.js"
@@ -36,86 +66,1021 @@ HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
     "Accept-Language": "en-US,en;q=0.9"
 }
+# 数据源地址 (基准测试时会指向本地夹具服务器)
+PH_FEED_URL = "https://www.producthunt.com/feed/category/artificial-intelligence"
+HN_API_BASE = "https://hacker-news.firebaseio.co/v0"
+HN_ITEM_PAGE = "https://news.ycombinator.com/item?id="
+
+# === 4. 并发配置 ===
+MAX_WORKERS = 16       # 全局并发上限
+PER_HOST_LIMIT = 4     # 单个域名同时最多的连接数
+SPIDER_DEADLINE = 120  # 整个抓取阶段的总时限 (秒)，超时后剩余任务直接走兜底
+PHASE_GRACE = 5        # 到时限后等待各数据源交回已完成条目的余量 (秒)
+
+# === 5. 翻译缓存 ===
+CACHE_DIR = ".cache"
+TRANS_CACHE_FILE = os.path.join(CACHE_DIR, "translations.json")
+TRANS_CACHE_MAX_AGE = 30 * 86400  # 超过 30 天没被用到的译文淘汰
+TRANS_CACHE_MAX_ENTRIES = 5000    # 条目上限，超出时先淘汰最久未使用的
+TRANS_MAX_CHARS = 800             # 单条文本的翻译长度上限
+TRANS_BATCH_CHARS = 4500          # 单次批量请求的字符上限 (Google 接口上限 5000)
+
+# === 6. HTTP 缓存 (条件请求) ===
+HTTP_CACHE_DIR = os.path.join(CACHE_DIR, "http")
+HTTP_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 正文总大小上限，超出时淘汰最久未使用的
+# 缓存类别由调用方显式传入 (fetch 的 kind 参数)，不按 URL 猜测
+HTTP_CACHE_TTL = {
+    "feed": 10 * 60,          # 列表类 (各数据源的 feed / API 列表，fetch 的缺省类别)，过期后带校验头重新请求
+    "hn_item": 7 * 86400,     # HN 条目抓过之后基本不变
+    "page": 30 * 86400,       # 文章页面
+}
+SUMMARY_CACHE_TTL = 30 * 86400  # 已提取成功的文章摘要直接复用，不再下载页面
+
+# === 7. 摘要提取 (流式) ===
+SUMMARY_MAX_BYTES = 512 * 1024  # 单个页面最多读取的字节数
+SUMMARY_CHUNK = 16 * 1024       # 每次从网络读取并喂给解析器的块大小
+SUMMARY_STALL_BYTES = 64 * 1024  # 解析器积压的未闭合内容上限，超过视为畸形页面
+SCRIPT_TAIL_BYTES = 64           # 丢弃超长 script/style 内容时保留的末尾，足够容纳被切开的闭合标签
+SUMMARY_LABELS = {
+    "og": "OG抓取", "meta": "Meta抓取", "body": "正文抓取", "none": "未找到",
+    "skip": "跳过", "not_html": "非网页", "timeout": "超时", "error": "出错",
+}
+
+# === 8. 增量合并 ===
+NEWS_RETENTION_DAYS = 7  # 增量模式下旧条目保留的天数 (按首次收录时间)
+MAX_NEWS = 120           # 合并后新闻总数上限
+DATA_PREFIX = "window.AI_DATA = "
+
+def make_id(url):
+    """按链接生成稳定 id，同一篇文章跨次运行、跨来源都是同一个 id"""
+    url = (url or "").split("#", 1)[0].strip().rstrip("/")
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+
+def load_data_file(path=DATA_FILE):
+    """读回上次生成的 data.js，失败时返回 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f: js = f.read().strip()
+        if not js.startswith(DATA_PREFIX): return None
+        return json.loads(js[len(DATA_PREFIX):].rstrip(";"))
+    except (OSError, ValueError): return None
+
+# === 9. 分片输出 ===
+SPLIT_DIR = "data"               # 分片与 manifest 的输出目录
+MANIFEST_FILE = "manifest.json"  # 页面首先加载的清单，文件名固定
+
+def shard_name(prefix, body):
+    """内容哈希文件名：内容不变文件名就不变，可以永久缓存"""
+    safe = re.sub(r'[^A-Za-z0-9_-]', '_', prefix)
+    return f"{safe}.{hashlib.sha1(body).hexdigest()[:10]}.json"
+
+def write_if_changed(path, body):
+    """只在内容不同时写入，返回是否写入"""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == body: return False
+    except OSError: pass
+    with open(path + ".tmp", "wb") as f: f.write(body)
+    os.replace(path + ".tmp", path)
+    return True
+
+# === 10. 搜索索引 ===
+TREND_KEYWORDS = ["GPT", "Claude", "Llama", "OpenAI", "Video", "Image", "开源", "免费", "Agent", "Sora", "DeepSeek", "Code"]
+TOKEN_RE = re.compile(r'[a-z0-9]+|[\u3400-\u4dbf\u4e00-\u9fff]+')
+
+def tokenize(text):
+    """英文按词切分 (小写)；中文连续片段切成单字 + 相邻两字 bigram。需与 index.html 中的 tokenize 保持一致"""
+    tokens = set()
+    for run in TOKEN_RE.findall((text or "").lower()):
+        if run[0] < "\u3400":
+            tokens.add(run)
+            continue
+        tokens.update(run)
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+def build_search_index(news):
+    """
+    倒排索引：terms 有序排列，postings[i] 为 terms[i] 命中的新闻下标列表。
+    用两个平行数组而不是对象，避免 JS 对数字键重新排序；前端在词表里做子串匹配。
+    只作为分片输出，data.js 兼容模式下页面直接逐条过滤。
+    """
+    postings = {}
+    for i, item in enumerate(news):
+        for tok in tokenize(f"{item.get('title', '')} {item.get('desc', '')} {item.get('src', '')}"):
+            postings.setdefault(tok, []).append(i)
+    terms = sorted(postings)
+    # 热词与页面原算法一致：标题+摘要中包含关键词的条数，取前 5
+    counts = []
+    for key in TREND_KEYWORDS:
+        n = sum(1 for item in news if key.lower() in f"{item.get('title', '')} {item.get('desc', '')}".lower())
+        if n: counts.append((key, n))
+    counts.sort(key=lambda kv: -kv[1])
+    return {"terms": terms, "postings": [postings[t] for t in terms], "tags": [k for k, _ in counts[:5]]}
+
+# === 11. 运行指标 ===
+REPORT_FILE = "run_report.json"      # 与 data.js 放在一起的机器可读运行报告
+REPORT_PROM_FILE = "run_report.prom"  # 可选：Prometheus 文本格式
+INSTRUMENTED = ["fetch", "fetch_page", "extract_summary", "translate_many",
+                "run_spider", "rebuild", "make_ranks", "make_prompts", "record_history", "save", "save_split"]
+
+class Metrics:
+    """
+    记录各阶段耗时与事件计数。只在启用时才包装 DataEngine 的方法，
+    未启用时 engine.metrics 为 None，埋点处仅多一次判空。
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {}   # 名称 -> 每次调用耗时 (秒)
+        self.counters = {}  # 事件名 -> 次数 (或字节数)
+        self.started = time.time()
+
+    def count(self, name, n=1):
+        with self.lock: self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, secs):
+        with self.lock: self.timings.setdefault(name, []).append(secs)
+
+    def wrap(self, name, fn, inspect=None):
+        """返回计时包装后的函数，inspect(result) 用于从返回值里记录状态码等"""
+        def wrapper(*args, **kwargs):
+            t = time.perf_counter()
+            try: result = fn(*args, **kwargs)
+            finally: self.observe(name, time.perf_counter() - t)
+            if inspect: inspect(result)
+            return result
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    def report(self):
+        timings = {}
+        with self.lock:
+            for name, samples in sorted(self.timings.items()):
+                ordered = sorted(samples)
+                timings[name] = {
+                    "count": len(ordered), "total": round(sum(ordered), 4), "max": round(ordered[-1], 4),
+                    "p50": round(ordered[len(ordered) // 2], 4), "p95": round(ordered[int(len(ordered) * 0.95)], 4),
+                }
+            counters = dict(sorted(self.counters.items()))
+        return {"started": int(self.started), "elapsed": round(time.time() - self.started, 3),
+                "timings": timings, "counters": counters}
+
+    @staticmethod
+    def prometheus(report):
+        lines = ["# TYPE ai_nexus_duration_seconds summary"]
+        for name, t in report["timings"].items():
+            lines.append(f'ai_nexus_duration_seconds_sum{{op="{name}"}} {t["total"]}')
+            lines.append(f'ai_nexus_duration_seconds_count{{op="{name}"}} {t["count"]}')
+        lines.append("# TYPE ai_nexus_events_total counter")
+        for name, n in report["counters"].items():
+            lines.append(f'ai_nexus_events_total{{event="{name}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+# === 12. 近似去重 ===
+DEDUP_FILE = os.path.join(CACHE_DIR, "dedup.json")
+DEDUP_MAX_AGE = 30 * 86400    # 指纹保留 30 天
+DEDUP_MAX_ENTRIES = 3000
+DEDUP_THRESHOLD = 0.75        # 标题词集合的 Jaccard 相似度达到该值即视为同一条 (短标题只差一个词时不算)
+DEDUP_PAST_THRESHOLD = 0.9    # 与往日条目比对时更严格 (且要求同一站点)，命中后会直接沿用旧条目
+MINHASH_BANDS = 8             # LSH 分段数 x 每段行数 = MinHash 签名长度
+MINHASH_ROWS = 2
+STOPWORDS = {"a", "an", "the", "and", "or", "for", "to", "of", "in", "on", "with", "by", "at", "from", "your",
+             "is", "it", "its", "this", "that", "new", "show", "hn", "launch", "ask", "via"}
+_MERSENNE = (1 << 61) - 1
+# 每个哈希函数的 (a, b) 从同一个随机流里依次取出 (Random(-i) 与 Random(i) 是同一个流，不能用来区分)
+_MINHASH_SEEDS = [(lambda rng: (rng.randrange(1, _MERSENNE), rng.randrange(_MERSENNE)))(random.Random(i))
+                  for i in range(1, MINHASH_BANDS * MINHASH_ROWS + 1)]
+_TRACKING_PARAMS = ("utm_", "ref", "source", "fbclid", "gclid")
+TITLE_TOKEN_RE = re.compile(r'[a-z0-9]+(?:\.[0-9]+)*|[\u3400-\u4dbf\u4e00-\u9fff]+')  # 版本号 (3.1) 作为整体
+
+def title_tokens(title):
+    """标题归一化成词集合：英文去停用词并做简单的复数还原，中文取 bigram"""
+    words = set()
+    for run in TITLE_TOKEN_RE.findall((title or "").lower()):
+        if run[0] < "\u3400":
+            if run in STOPWORDS: continue
+            if len(run) > 3 and run.endswith("s") and not run.endswith("ss"): run = run[:-1]
+            words.add(run)
+        elif len(run) == 1:
+            words.add(run)
+        else:
+            words.update(run[i:i + 2] for i in range(len(run) - 1))
+    return sorted(words)
+
+def canonical_url(url):
+    """忽略协议、www、末尾斜杠、锚点和常见追踪参数后的链接"""
+    p = urlparse((url or "").strip())
+    host = p.netloc.lower()
+    if host.startswith("www."): host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(p.query) if not k.lower().startswith(_TRACKING_PARAMS))
+    return host + p.path.rstrip("/") + ("?" + urlencode(query) if query else "")
+
+def minhash(tokens):
+    hashes = [int.from_bytes(hashlib.md5(t.encode("utf-8")).digest()[:8], "big") for t in tokens]
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _MINHASH_SEEDS]
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+class DedupIndex:
+    """
+    标题 MinHash + LSH 分段索引，外加规范化链接的精确索引。
+    path 为 None 时只在内存中使用 (单次运行内去重)；否则持久化，并保存处理好的条目以便跨天复用。
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.bands = None  # 首次查询时才计算签名
+        self.by_url = {}
+        self.dirty = False
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f: self.entries = json.load(f).get("entries", {})
+            except (OSError, ValueError): pass
+        for key, entry in self.entries.items(): self.by_url[entry["url"]] = key
+
+    def _band_keys(self, tokens):
+        sig = minhash(tokens)
+        return [(b, tuple(sig[b * MINHASH_ROWS:(b + 1) * MINHASH_ROWS])) for b in range(MINHASH_BANDS)]
+
+    def _index(self, key, tokens):
+        if not tokens: return
+        for band in self._band_keys(tokens): self.bands.setdefault(band, set()).add(key)
+
+    def _ensure_bands(self):
+        if self.bands is None:
+            self.bands = {}
+            for key, entry in self.entries.items(): self._index(key, entry["tokens"])
+
+    def match(self, tokens, url, threshold=DEDUP_THRESHOLD, same_host=False):
+        """返回近似重复条目的 key，没有则为 None；same_host 时只认同一站点的标题近似"""
+        with self.lock:
+            if url and url in self.by_url: return self.by_url[url]
+            if not tokens: return None
+            self._ensure_bands()
+            candidates = set()
+            for band in self._band_keys(tokens): candidates |= self.bands.get(band, set())
+            if same_host:
+                host = (url or "").split("/", 1)[0]
+                candidates = {key for key in candidates if self.entries[key]["url"].split("/", 1)[0] == host}
+            # 词太少时 Jaccard 不可靠，只认完全相同
+            if len(tokens) < 3: threshold = 1.0
+            best, best_sim = None, threshold
+            for key in sorted(candidates):
+                sim = jaccard(tokens, self.entries[key]["tokens"])
+                if sim >= best_sim: best, best_sim = key, sim
+            return best
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return dict(entry["item"]) if entry and entry.get("item") else None
+
+    def add(self, key, tokens, url, item=None):
+        with self.lock:
+            self._ensure_bands()
+            self.entries[key] = {"tokens": tokens, "url": url, "ts": int(time.time()), "item": item}
+            if url: self.by_url[url] = key
+            self._index(key, tokens)
+            self.dirty = True
+
+    def touch(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries[key]["ts"] = int(time.time())
+                self.dirty = True
+
+    def save(self):
+        if not self.path: return
+        with self.lock:
+            if not self.dirty: return
+            cutoff = time.time() - DEDUP_MAX_AGE
+            alive = sorted(((k, v) for k, v in self.entries.items() if v["ts"] >= cutoff), key=lambda kv: kv[1]["ts"], reverse=True)
+            self.entries = dict(alive[:DEDUP_MAX_ENTRIES])
+            # 淘汰后链接索引重建、分段索引下次查询时重算，否则 match 会指向已删除的 key
+            self.by_url = {entry["url"]: key for key, entry in self.entries.items()}
+            self.bands = None
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump({"entries": self.entries}, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(self.path + ".tmp", self.path)
+                self.dirty = False
+            except OSError as e:
+                print(f"⚠️ 去重索引写入失败: {e}")
+
+# === 13. 历史快照 ===
+HISTORY_FILE = "history.db"     # 随 data.js 一起提交，每天只增加几 KB
+HISTORY_RETENTION_DAYS = 400    # 超过约一年的快照删除
+HISTORY_NEW_DAYS = 7            # "本周新上榜" 的窗口
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (day INTEGER PRIMARY KEY, ts INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS tools (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, category TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS tools_category ON tools (category, name);
+CREATE TABLE IF NOT EXISTS ranks (
+    tool INTEGER NOT NULL, day INTEGER NOT NULL, rank INTEGER NOT NULL, score INTEGER NOT NULL,
+    PRIMARY KEY (tool, day)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ranks_day ON ranks (day, rank);
+CREATE TABLE IF NOT EXISTS news (
+    id TEXT PRIMARY KEY, first_day INTEGER NOT NULL, src TEXT, type TEXT, title TEXT, url TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS news_days (day INTEGER NOT NULL, id TEXT NOT NULL, pos INTEGER NOT NULL,
+    PRIMARY KEY (day, id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS news_first_day ON news (first_day);
+"""
+
+def day_number(dt=None):
+    """北京时间日期 → 连续的整数天号，快照按天存储，同一天重复运行覆盖当天"""
+    return (dt or get_beijing_now()).date().toordinal()
+
+class History:
+    """每次运行的榜单与新闻快照 (SQLite)，用来算名次变化、连续在榜天数和本周新上榜
+
+    工具名与新闻正文各只存一份，每天的快照只是 (工具号, 天号, 名次, 分数×10) 这样的整数行，
+    主键即索引且不带 rowid，几个月的日快照查询也只是一次范围扫描。
+    """
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(HISTORY_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def tool_ids(self, ranks):
+        ids = {}
+        for cat, items in ranks.items():
+            for item in items:
+                self.db.execute("INSERT INTO tools (name, category) VALUES (?, ?) "
+                                "ON CONFLICT (name) DO UPDATE SET category = excluded.category", (item["name"], cat))
+        for tid, name in self.db.execute("SELECT id, name FROM tools"): ids[name] = tid
+        return ids
+
+    def record(self, day, ranks, news):
+        """写入当天快照 (已有则整体替换)，并清理过期数据"""
+        with self.db:
+            ids = self.tool_ids(ranks)
+            self.db.execute("DELETE FROM ranks WHERE day = ?", (day,))
+            self.db.execute("DELETE FROM news_days WHERE day = ?", (day,))
+            self.db.execute("INSERT OR REPLACE INTO runs (day, ts) VALUES (?, ?)", (day, int(time.time())))
+            self.db.executemany("INSERT INTO ranks (tool, day, rank, score) VALUES (?, ?, ?, ?)",
+                                [(ids[item["name"]], day, item["rank"], round(float(item["score"]) * 10))
+                                 for items in ranks.values() for item in items])
+            self.db.executemany("INSERT OR IGNORE INTO news (id, first_day, src, type, title, url) VALUES (?, ?, ?, ?, ?, ?)",
+                                [(n["id"], day, n.get("src"), n.get("type"), n.get("title"), n.get("url")) for n in news])
+            self.db.executemany("INSERT OR IGNORE INTO news_days (day, id, pos) VALUES (?, ?, ?)",
+                                [(day, n["id"], i) for i, n in enumerate(news)])
+            cutoff = day - HISTORY_RETENTION_DAYS
+            self.db.execute("DELETE FROM runs WHERE day < ?", (cutoff,))
+            self.db.execute("DELETE FROM ranks WHERE day < ?", (cutoff,))
+            self.db.execute("DELETE FROM news_days WHERE day < ?", (cutoff,))
+            self.db.execute("DELETE FROM news WHERE id NOT IN (SELECT id FROM news_days)")
+
+    def rank_stats(self, day):
+        """当天榜单每个工具的 {名字: (名次变化, 连续在榜次数, 是否本周新上榜)}
+
+        名次变化对比上一次快照 (正数为上升，上次不在榜为 None)；连续次数按快照计，
+        某天没有运行不算断档；首次快照早于窗口时才标记新上榜，避免第一次运行全部是 "新"。
+        """
+        days = [d for (d,) in self.db.execute("SELECT day FROM runs WHERE day <= ? ORDER BY day DESC", (day,))]
+        if not days or days[0] != day: return {}
+        index = {d: i for i, d in enumerate(days)}
+        rows = self.db.execute("SELECT t.name, r.day, r.rank FROM ranks r JOIN tools t ON t.id = r.tool "
+                               "WHERE r.tool IN (SELECT tool FROM ranks WHERE day = ?) AND r.day <= ? "
+                               "ORDER BY r.tool, r.day DESC", (day, day))
+        seen = {}
+        for name, d, rank in rows: seen.setdefault(name, []).append((index[d], rank))
+        window_start = day - HISTORY_NEW_DAYS + 1
+        history_older = days[-1] < window_start
+        stats = {}
+        for name, hist in seen.items():
+            streak = 0
+            while streak < len(hist) and hist[streak][0] == streak: streak += 1
+            delta = hist[1][1] - hist[0][1] if streak > 1 else None
+            first_day = days[hist[-1][0]]
+            stats[name] = (delta, streak, history_older and first_day >= window_start)
+        return stats
+
+    def new_news(self, day):
+        """本周首次收录的新闻 id"""
+        return {i for (i,) in self.db.execute("SELECT id FROM news WHERE first_day > ?", (day - HISTORY_NEW_DAYS,))}
+
+_thread_local = threading.local()
+
+class TranslationCache:
+    """按原文内容哈希存储译文的磁盘缓存，线程安全"""
+    def __init__(self, path=TRANS_CACHE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = False
+        self.stats = {"hit": 0, "miss": 0, "calls": 0}
+        try:
+            with open(path, "r", encoding="utf-8") as f: self.entries = json.load(f)
+        except (OSError, ValueError): pass
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, text):
+        with self.lock:
+            entry = self.entries.get(self.key(text))
+            if entry is None:
+                self.stats["miss"] += 1
+                return None
+            self.stats["hit"] += 1
+            entry["ts"] = int(time.time())
+            self.dirty = True
+            return entry["t"]
+
+    def put(self, text, result):
+        with self.lock:
+            self.entries[self.key(text)] = {"t": result, "ts": int(time.time())}
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty: return
+            # 先按时间淘汰，再按条目数淘汰最久未使用的
+            cutoff = time.time() - TRANS_CACHE_MAX_AGE
+            alive = [(k, v) for k, v in self.entries.items() if v["ts"] >= cutoff]
+            alive.sort(key=lambda kv: kv[1]["ts"], reverse=True)
+            self.entries = dict(alive[:TRANS_CACHE_MAX_ENTRIES])
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f: json.dump(self.entries, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+                self.dirty = False
+            except OSError as e:
+                print(f"⚠️ 翻译缓存写入失败: {e}")
+
+class HttpCache:
+    """
+    持久化 HTTP 响应缓存：记录 ETag / Last-Modified 并支持条件请求，
+    304 时直接复用本地正文。另外保存已提取的文章摘要。
+    """
+    def __init__(self, root=HTTP_CACHE_DIR):
+        self.root = root
+        self.index_file = os.path.join(root, "index.json")
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.summaries = {}
+        self.dirty = False
+        self.stats = {"fresh": 0, "revalidated": 0, "miss": 0, "summary": 0, "saved_bytes": 0}
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f: data = json.load(f)
+            self.entries = data.get("entries", {})
+            self.summaries = data.get("summaries", {})
+        except (OSError, ValueError): pass
+
+    def body_path(self, url):
+        return os.path.join(self.root, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def lookup(self, url, kind):
+        """返回 (缓存条目, 是否仍在 kind 类别的有效期内)；没有缓存时条目为 None"""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                self.stats["miss"] += 1
+                return None, False
+            entry = dict(entry)
+        return entry, time.time() - entry["ts"] < HTTP_CACHE_TTL[kind]
+
+    @staticmethod
+    def validators(entry):
+        headers = {}
+        if entry and entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def response(self, url, entry, revalidated=False):
+        """用缓存正文拼出一个 requests.Response，调用方无需区分来源"""
+        try:
+            with open(self.body_path(url), "rb") as f: body = f.read()
+        except OSError:
+            with self.lock: self.entries.pop(url, None)
+            return None
+        r = load_requests().Response()
+        r.status_code = 200
+        r.url = url
+        r._content = body
+        r.encoding = entry.get("encoding")
+        r.headers["Content-Type"] = entry.get("ctype", "")
+        with self.lock:
+            self.stats["revalidated" if revalidated else "fresh"] += 1
+            self.stats["saved_bytes"] += len(body)
+            now = int(time.time())
+            if url in self.entries:
+                self.entries[url]["used"] = now
+                if revalidated: self.entries[url]["ts"] = now
+            self.dirty = True
+        return r
+
+    def store(self, url, r, body=None):
+        """body 为流式读取时实际读到的前缀，缺省取完整正文"""
+        if r.status_code != 200: return
+        if body is None: body = r.content
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            path = self.body_path(url)
+            with open(path + ".tmp", "wb") as f: f.write(body)
+            os.replace(path + ".tmp", path)
+        except OSError: return
+        now = int(time.time())
+        with self.lock:
+            self.entries[url] = {
+                "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"),
+                "ctype": r.headers.get("Content-Type", ""), "encoding": r.encoding,
+                "size": len(body), "ts": now, "used": now,
+            }
+            self.dirty = True
+
+    def get_summary(self, url):
+        with self.lock:
+            entry = self.summaries.get(url)
+            if entry is None or time.time() - entry["ts"] >= SUMMARY_CACHE_TTL: return None
+            self.stats["summary"] += 1
+            return entry["text"]
+
+    def put_summary(self, url, text):
+        with self.lock:
+            self.summaries[url] = {"text": text, "ts": int(time.time())}
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty: return
+            now = time.time()
+            self.summaries = {u: e for u, e in self.summaries.items() if now - e["ts"] < SUMMARY_CACHE_TTL}
+            # 按最近使用时间保留，直到正文总大小不超过上限
+            total, keep = 0, {}
+            for url, entry in sorted(self.entries.items(), key=lambda kv: kv[1]["used"], reverse=True):
+                total += entry["size"]
+                if total > HTTP_CACHE_MAX_BYTES:
+                    try: os.remove(self.body_path(url))
+                    except OSError: pass
+                    continue
+                keep[url] = entry
+            self.entries = keep
+            try:
+                os.makedirs(self.root, exist_ok=True)
+                with open(self.index_file + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump({"entries": self.entries, "summaries": self.summaries}, f, ensure_ascii=False)
+                os.replace(self.index_file + ".tmp", self.index_file)
+                self.dirty = False
+            except OSError as e:
+                print(f"⚠️ HTTP 缓存写入失败: {e}")
+
+class SummaryParser(HTMLParser):
+    """
+    增量解析网页，依次收集 og:description、meta description 和正文首个长段落。
+    done 为 True 时说明后面的内容已经不会改变结果，调用方可以停止读取。
+    """
+    def __init__(self):
+        super().__init__()
+        self.og = None
+        self.meta = None
+        self.body = None
+        self.done = False
+        self.stalled = False
+        self.cut = False   # 因总时限中途停止读取，结果不完整
+        self.skip = 0      # 位于 script/style 内部
+        self.in_p = False
+        self.buf = []
+
+    @property
+    def result(self):
+        """按优先级返回 (文本, 来源)，来源为 og / meta / body"""
+        if self.og: return self.og, "og"
+        if self.meta: return self.meta, "meta"
+        if self.body: return self.body, "body"
+        return None, None
+
+    def feed(self, data):
+        super().feed(data)
+        if len(self.rawdata) <= SUMMARY_STALL_BYTES: return
+        if self.cdata_elem:
+            # 大段内联 script/style (如 __NEXT_DATA__) 在等闭合标签，内容本来就不要，
+            # 丢掉已缓冲的部分，只留末尾以免截断跨块的 </script>
+            self.rawdata = self.rawdata[-SCRIPT_TAIL_BYTES:]
+        else:
+            # 积压的未解析内容过多说明有标签或注释没闭合，继续喂只会反复回扫
+            self.stalled = self.done = True
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            a = dict(attrs)
+            content = (a.get("content") or "").strip()
+            if len(content) <= 20: return
+            if (a.get("property") or "").lower() == "og:description" and self.og is None:
+                self.og = content
+                self.done = True
+            elif (a.get("name") or "").lower() == "description" and self.meta is None:
+                self.meta = content
+        elif tag in ("script", "style"):
+            self.skip += 1
+        elif tag == "body":
+            # head 里已经有 meta description，正文不会再被用到
+            if self.meta: self.done = True
+        elif tag == "p":
+            self.close_paragraph()
+            self.in_p = True
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self.skip = max(0, self.skip - 1)
+        elif tag == "head":
+            if self.meta: self.done = True
+        elif tag == "p":
+            self.close_paragraph()
+
+    def handle_data(self, data):
+        if self.in_p and not self.skip: self.buf.append(data)
+
+    def close_paragraph(self):
+        if not self.in_p: return
+        self.in_p = False
+        text = " ".join("".join(self.buf).split())
+        self.buf = []
+        # 如果这段话长度适中（大于50字），很可能是正文摘要
+        if len(text) > 50 and self.body is None:
+            self.body = text[:300] + "..." # 截取前300字
+            self.done = True
+
+def is_html(ctype):
+    return not ctype or "html" in ctype.lower()
+
+def make_decoder(ctype):
+    """按 Content-Type 里的 charset 建增量解码器，缺省按 UTF-8"""
+    m = re.search(r'charset=["\']?([\w.:-]+)', ctype or "", re.IGNORECASE)
+    try: return codecs.getincrementaldecoder(m.group(1) if m else "utf-8")(errors="replace")
+    except (LookupError, TypeError): return codecs.getincrementaldecoder("utf-8")(errors="replace")
 
 def get_beijing_now():
     utc_now = datetime.datetime.utcnow()
     return utc_now + datetime.timedelta(hours=8)
 
 class DataEngine:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
+    def __init__(self, workers=MAX_WORKERS, deadline=SPIDER_DEADLINE, incremental=False, translator_factory=None,
+                 metrics=False, sources=None):
+        self.workers = max(1, workers)
+        self.deadline_secs = deadline
+        self.deadline = None
+        self.pool = None
+        self.host_slots = {}
+        self.host_lock = threading.Lock()
         self.news = []
         self.ranks = {}
         self.prompts = []
         self.seen_titles = set()
+        self.sources = list(SOURCES if sources is None else sources)
+        self.incremental = incremental
+        self.previous = {}   # 增量模式：上次 data.js 中的条目，按 id 索引
+        self.reused = 0
+        # translator_factory 返回带 translate(text) 方法的对象，可替换为桩 (基准测试)；
+        # 缺省在第一次翻译时才决定用哪个后端
+        self.translator_factory = translator_factory
+        self.metrics = None
+        if metrics: self.enable_metrics()
 
-    def fetch(self, url):
-        try: return self.session.get(url, timeout=10, verify=False)
-        except: return None
+    def warm_up(self):
+        """在主线程里先把会话和各类缓存建好，避免多个工作线程同时触发首次创建"""
+        for name in ("session", "trans_cache", "http_cache", "dedup"): getattr(self, name)
+
+    # 会话与各类缓存都在第一次用到时才创建 / 读盘
+    @cached_property
+    def session(self):
+        requests = load_requests()
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        # 连接池大小与并发上限对齐，否则多线程下 urllib3 会频繁丢弃连接
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.workers * 2, pool_maxsize=PER_HOST_LIMIT)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @cached_property
+    def trans_cache(self):
+        return TranslationCache()
+
+    @cached_property
+    def http_cache(self):
+        return HttpCache()
+
+    @cached_property
+    def dedup(self):
+        return DedupIndex(DEDUP_FILE)
+
+    def enable_metrics(self):
+        """给 INSTRUMENTED 中的方法套上计时包装；不调用则没有任何额外开销"""
+        self.metrics = m = Metrics()
+        # 状态码与字节数只统计真实网络响应，由 fetch / fetch_page 自己计数；这里只记失败
+        inspectors = {
+            "fetch": lambda r: r is None and m.count("fetch.failed"),
+            "fetch_page": lambda res: res[0] is None and m.count("page.status.failed"),
+        }
+        for name in INSTRUMENTED:
+            setattr(self, name, m.wrap(name, getattr(self, name), inspectors.get(name)))
+
+    def write_report(self, prom=False):
+        """把运行报告写在 data.js 旁边，附带缓存统计"""
+        if not self.metrics: return
+        report = self.metrics.report()
+        report["news"] = len(self.news)
+        report["translation_cache"] = dict(self.trans_cache.stats)
+        report["http_cache"] = dict(self.http_cache.stats)
+        out_dir = os.path.dirname(DATA_FILE)
+        try:
+            with open(os.path.join(out_dir, REPORT_FILE), "w", encoding="utf-8") as f: json.dump(report, f, ensure_ascii=False, indent=2)
+            if prom:
+                with open(os.path.join(out_dir, REPORT_PROM_FILE), "w", encoding="utf-8") as f: f.write(Metrics.prometheus(report))
+            print(f"📊 运行报告: {REPORT_FILE}" + (f" / {REPORT_PROM_FILE}" if prom else ""))
+        except OSError as e:
+            print(f"⚠️ 运行报告写入失败: {e}")
+
+    # === 并发调度：全局线程池 + 单域名限流 + 总时限 ===
+    def host_slot(self, url):
+        """返回该域名的信号量，用 with 包住请求即可限制单域名并发"""
+        host = urlparse(url).netloc
+        with self.host_lock:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = self.host_slots[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return slot
+
+    def time_left(self):
+        """剩余时间取总时限与当前数据源预算 (线程局部) 中较早的一个"""
+        deadlines = [d for d in (self.deadline, getattr(_thread_local, "deadline", None)) if d is not None]
+        if not deadlines: return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def request_timeout(self, limit):
+        """单次请求的超时不能超过剩余总时限"""
+        left = self.time_left()
+        return limit if left is None else min(limit, left)
+
+    def gather(self, fn, jobs):
+        """
+        并发执行 fn(*job)，按提交顺序返回结果；超时、出错或被取消的位置为 None。
+        调用方所在数据源的时间预算会随任务一起带到工作线程里。
+        """
+        if self.pool is None:
+            return [self._call(fn, job) for job in jobs]
+        until = getattr(_thread_local, "deadline", None)
+        futures = [self.pool.submit(self._call_until, until, fn, job) for job in jobs]
+        results = []
+        for f in futures:
+            try: results.append(f.result(timeout=self.time_left()))
+            except Exception:
+                f.cancel()
+                results.append(None)
+        return results
+
+    def _call(self, fn, job):
+        try: return fn(*job)
+        except Exception: return None
+
+    def _call_until(self, until, fn, job):
+        prev = getattr(_thread_local, "deadline", None)
+        _thread_local.deadline = until
+        try: return fn(*job)
+        finally: _thread_local.deadline = prev
+
+    def fetch(self, url, timeout=10, kind="feed"):
+        """
+        带缓存的 GET：有效期内直接读本地，过期后发条件请求，304 时复用本地正文。
+        kind 为 HTTP_CACHE_TTL 中的缓存类别，缺省按列表处理 (有效期最短)。
+        """
+        entry, fresh = self.http_cache.lookup(url, kind)
+        if fresh:
+            r = self.http_cache.response(url, entry)
+            if r is not None:
+                if self.metrics: self.metrics.count("http.cache.fresh")
+                return r
+        timeout = self.request_timeout(timeout)
+        if timeout <= 0:
+            if self.metrics: self.metrics.count("deadline.skipped")
+            return None
+        try:
+            with self.host_slot(url):
+                r = self.session.get(url, timeout=timeout, verify=False, headers=self.http_cache.validators(entry))
+        except Exception as e:
+            if self.metrics: self.metrics.count("fetch.timeout" if isinstance(e, load_requests().Timeout) else "fetch.error")
+            return None
+        if self.metrics:
+            self.metrics.count(f"http.status.{r.status_code}")
+            self.metrics.count("http.bytes", len(r.content))
+        if r.status_code == 304 and entry:
+            if self.metrics: self.metrics.count("http.cache.revalidated")
+            return self.http_cache.response(url, entry, revalidated=True)
+        self.http_cache.store(url, r)
+        return r
+
+    def fetch_json(self, url, kind="feed"):
+        r = self.fetch(url, kind=kind)
+        if not r or r.status_code != 200: return None
+        try: return r.json()
+        except ValueError: return None
 
     def smart_trans(self, text):
         if not text: return ""
         text = text.strip()
         if len(text) < 5: return text
-        if TRANSLATE_AVAILABLE:
-            try: return translator.translate(text[:800]) # 增加翻译长度限制到800
-            except: pass
-        return text
+        return self.translate_many([text])[0]
+
+    def translate_many(self, texts, missed=None):
+        """
+        批量翻译：先查缓存，未命中的文本去重后拼成尽量少的请求。
+        返回与 texts 一一对应的译文，失败的保留原文；传入 missed 列表时追加翻译失败的下标
+        (未配置翻译服务时不算失败)。
+        """
+        out = []
+        pending = {}
+        for text in texts:
+            text = (text or "").strip()
+            if len(text) < 5:
+                out.append(text)
+                continue
+            text = text[:TRANS_MAX_CHARS]
+            cached = self.trans_cache.get(text) if text not in pending else None
+            out.append(cached if cached is not None else text)
+            if cached is None: pending.setdefault(text, []).append(len(out) - 1)
+        if self.translator_factory is None: self.translator_factory = default_translator_factory() or False
+        if not pending or not self.translator_factory: return out
+
+        for text, result in self.translate_batch(list(pending)):
+            self.trans_cache.put(text, result)
+            for idx in pending.pop(text, ()): out[idx] = result
+        if missed is not None:
+            for idxs in pending.values(): missed.extend(idxs)
+        return out
+
+    def translate_batch(self, texts):
+        """按字符上限分组，每组用换行拼成一次请求；行数对不上时整组退回逐条翻译"""
+        chunk, size = [], 0
+        for text in texts + [None]:
+            line = None if text is None else " ".join(text.split())
+            if chunk and (line is None or size + len(line) + 1 > TRANS_BATCH_CHARS):
+                yield from self._translate_chunk(chunk)
+                chunk, size = [], 0
+            if line is not None:
+                chunk.append((text, line))
+                size += len(line) + 1
+
+    def _translate_chunk(self, chunk):
+        if len(chunk) > 1:
+            joined = self._translate_call("\n".join(line for _, line in chunk))
+            parts = joined.split("\n") if joined else []
+            if len(parts) == len(chunk) and all(p.strip() for p in parts):
+                for (text, _), part in zip(chunk, parts): yield text, part.strip()
+                return
+        for text, _ in chunk:
+            result = self._translate_call(text)
+            if result: yield text, result
+
+    def get_translator(self):
+        """翻译器实例内部有可变状态，不能跨线程共享，每个线程各建一个"""
+        if getattr(_thread_local, "owner", None) is not self:
+            _thread_local.owner = self
+            _thread_local.translator = self.translator_factory()
+        return _thread_local.translator
+
+    def _translate_call(self, text):
+        with self.trans_cache.lock: self.trans_cache.stats["calls"] += 1
+        if self.metrics: self.metrics.count("translate.chars", len(text))
+        try:
+            with self.host_slot("https://translate.google.com"):
+                return self.get_translator().translate(text)
+        except: return None
 
     # === 🌟 核心升级：暴力抓取正文摘要 ===
     def extract_body_text(self, html):
         """当找不到 Meta 标签时，尝试提取网页正文的第一段有意义的文字"""
-        # 去除 script, style 等干扰标签
-        clean_html = re.sub(r'<(script|style).*?>.*?</\1>', '', html, flags=re.DOTALL)
-        clean_html = re.sub(r'', '', clean_html, flags=re.DOTALL)
-        # 提取所有 p 标签
-        paragraphs = re.findall(r'<p.*?>(.*?)</p>', clean_html, re.DOTALL)
-        
-        for p in paragraphs:
-            # 清除标签内的 HTML 标记
-            text = re.sub(r'<.*?>', '', p).strip()
-            # 如果这段话长度适中（大于50字），很可能是正文摘要
-            if len(text) > 50:
-                return text[:300] + "..." # 截取前300字
-        return ""
+        # 用增量解析器代替正则，遇到第一段长文字就停，大页面也是线性耗时
+        parser = SummaryParser()
+        for i in range(0, len(html), SUMMARY_CHUNK):
+            parser.feed(html[i:i + SUMMARY_CHUNK])
+            if parser.body or parser.stalled: break
+        return parser.body or ""
 
     def get_smart_summary(self, url, default_title):
         """
         全方位抓取摘要：OG标签 -> Meta Description -> 正文首段
         """
-        print(f"   🔍 深挖: {default_title[:15]}...", end="", flush=True)
+        text, found = self.extract_summary(url, default_title)
+        return self.smart_trans(text) if found else text
+
+    def extract_summary(self, url, default_title):
+        """只抓取不翻译，返回 (摘要原文, 是否抓到)；翻译留给批量阶段统一处理"""
+        cached = self.http_cache.get_summary(url)
+        if cached is not None:
+            if self.metrics: self.metrics.count("summary.cached")
+            return cached, True
+        text, found = self.scrape_summary(url, default_title)
+        if found: self.http_cache.put_summary(url, text)
+        return text, found
+
+    def summary_outcome(self, label, kind):
+        print(f"{label} [{SUMMARY_LABELS[kind]}]")
+        if self.metrics: self.metrics.count(f"summary.{kind}")
+        # 出错 / 超时属于临时失败：标记当前构建中的条目为 partial，下次运行重新构建
+        if kind in ("timeout", "error"): _thread_local.partial = True
+
+    def scrape_summary(self, url, default_title):
+        # 并发执行时多个线程同时输出，因此每条日志一次性整行打印
+        label = f"   🔍 深挖: {default_title[:15]}..."
+        if self.request_timeout(6) <= 0:
+            self.summary_outcome(label, "timeout")
+            return default_title, False
         try:
-            r = self.session.get(url, timeout=6, verify=False)
-            if r.status_code != 200: 
-                print(" [跳过]")
-                return default_title
-            
-            html = r.text
-            
-            # 1. 优先找 og:description
-            og_match = re.search(r'<meta\s+property=["\']og:description["\']\s+content=(["\'])(.*?)\1', html, re.IGNORECASE | re.DOTALL)
-            if og_match and len(og_match.group(2).strip()) > 20:
-                print(" [OG抓取]")
-                return self.smart_trans(og_match.group(2).strip())
-            
-            # 2. 其次找 name="description"
-            meta_match = re.search(r'<meta\s+name=["\']description["\']\s+content=(["\'])(.*?)\1', html, re.IGNORECASE | re.DOTALL)
-            if meta_match and len(meta_match.group(2).strip()) > 20:
-                print(" [Meta抓取]")
-                return self.smart_trans(meta_match.group(2).strip())
-            
-            # 3. 🔥 最后大招：抓取正文第一段
-            body_text = self.extract_body_text(html)
-            if body_text:
-                print(" [正文抓取]")
-                return self.smart_trans(body_text)
-
-            print(" [未找到]")
-            return default_title
+            parser = SummaryParser()
+            status, ctype = self.fetch_page(url, parser)
+            if status is None:
+                self.summary_outcome(label, "error")
+                return default_title, False
+            if status != 200: 
+                self.summary_outcome(label, "skip")
+                return default_title, False
+            if not is_html(ctype):
+                self.summary_outcome(label, "not_html")
+                return default_title, False
+
+            # 优先级：og:description -> name="description" -> 🔥 正文第一段
+            text, kind = parser.result
+            if text:
+                self.summary_outcome(label, kind)
+                return text, True
+
+            self.summary_outcome(label, "timeout" if parser.cut else "none")
+            return default_title, False
         except Exception:
-            print(f" [出错]")
-            return default_title
+            self.summary_outcome(label, "error")
+            return default_title, False
+
+    def fetch_page(self, url, parser):
+        """
+        流式读取网页喂给解析器，拿到结果或读满 SUMMARY_MAX_BYTES 就断开。
+        非网页类型不读正文。返回 (状态码, Content-Type)，请求失败时状态码为 None。
+        """
+        entry, fresh = self.http_cache.lookup(url, "page")
+        r = self.http_cache.response(url, entry) if fresh else None
+        if r is not None and self.metrics: self.metrics.count("page.cache.fresh")
+        if r is None:
+            timeout = self.request_timeout(6)
+            if timeout <= 0: return None, None
+            with self.host_slot(url):
+                live = self.session.get(url, timeout=timeout, verify=False, stream=True,
+                                        headers=self.http_cache.validators(entry))
+                try:
+                    if self.metrics: self.metrics.count(f"page.status.{live.status_code}")
+                    if live.status_code == 304 and entry:
+                        if self.metrics: self.metrics.count("page.cache.revalidated")
+                        r = self.http_cache.response(url, entry, revalidated=True)
+                    else:
+                        ctype = live.headers.get("Content-Type", "")
+                        if live.status_code != 200 or not is_html(ctype): return live.status_code, ctype
+                        body, complete = self.feed_parser(parser, live.iter_content(SUMMARY_CHUNK), ctype)
+                        # 因总时限被截断的前缀不完整，缓存后 30 天内都拿不到后面的摘要，因此不存
+                        if complete: self.http_cache.store(url, live, body)
+                        return 200, ctype
+                finally:
+                    live.close()
+            if r is None: return None, None
+        # 缓存里存的是上次读到的前缀，同样按块喂给解析器
+        ctype = r.headers.get("Content-Type", "")
+        if is_html(ctype):
+            body = r.content
+            self.feed_parser(parser, (body[i:i + SUMMARY_CHUNK] for i in range(0, len(body), SUMMARY_CHUNK)), ctype, live=False)
+        return 200, ctype
+
+    def feed_parser(self, parser, chunks, ctype, live=True):
+        """
+        解析器提前完成、超出字节上限或总时限用完时停止。
+        返回 (实际读取的字节, 是否完整)；只有因总时限中断时才不完整。live 为 False 表示正文来自缓存，不计入下载字节。
+        """
+        decoder = make_decoder(ctype)
+        body = bytearray()
+        complete = True
+        parse_secs = 0.0
+        for chunk in chunks:
+            body += chunk
+            t = time.perf_counter()
+            parser.feed(decoder.decode(chunk))
+            parse_secs += time.perf_counter() - t
+            if parser.done or len(body) >= SUMMARY_MAX_BYTES: break
+            if self.time_left() == 0:
+                complete = False
+                parser.cut = True
+                break
+        if self.metrics:
+            # 解析耗时单独记录，与 fetch_page 的总耗时 (含网络等待) 区分开
+            self.metrics.observe("parse_html", parse_secs)
+            if live: self.metrics.count("page.bytes", len(body))
+            if parser.stalled: self.metrics.count("page.stalled")
+            elif len(body) >= SUMMARY_MAX_BYTES: self.metrics.count("page.truncated")
+        return bytes(body[:SUMMARY_MAX_BYTES]), complete
 
     def parse_time(self, raw, is_unix=False):
         try:
@@ -134,71 +1099,199 @@ class DataEngine:
         print("   └─ 正在挖掘软件情报...")
         self.news = []
         self.seen_titles.clear()
-        
-        # Product Hunt
-        r = self.fetch("https://www.producthunt.com/feed/category/artificial-intelligence")
-        if r and r.status_code == 200:
-            try:
-                root = ET.fromstring(r.content)
-                ns = {'atom': 'http://www.w3.org/2005/Atom'}
-                entries = root.findall('atom:entry', ns) or root.findall('{http://www.w3.org/2005/Atom}entry')
-                for entry in entries[:15]:
-                    try:
-                        title = (entry.find('atom:title', ns) or entry.find('{http://www.w3.org/2005/Atom}title')).text
-                        if title in self.seen_titles: continue
-                        summary = (entry.find('atom:summary', ns) or entry.find('{http://www.w3.org/2005/Atom}summary')).text
-                        link = (entry.find('atom:link', ns) or entry.find('{http://www.w3.org/2005/Atom}link')).attrib['href']
-                        pub = (entry.find('atom:published', ns) or entry.find('{http://www.w3.org/2005/Atom}published')).text
-                        
-                        # 如果自带摘要太短，也尝试深挖一下
-                        final_desc = summary
-                        if len(summary) < 30:
-                            final_desc = self.get_smart_summary(link, title)
-                        else:
-                            final_desc = self.smart_trans(summary)
-
-                        self.news.append({
-                            "id": str(len(self.news)), "src": "Product Hunt", "type": "APP",
-                            "title": self.smart_trans(title),
-                            "desc": final_desc,
-                            "url": link, "time": self.parse_time(pub)
-                        })
-                        self.seen_titles.add(title)
-                        print("📱", end="", flush=True)
-                    except: continue
-            except: pass
-
-        # Hacker News
-        r = self.fetch("https://hacker-news.firebaseio.co/v0/topstories.json")
-        if r:
-            try:
-                ids = r.json()[:60]
-                keys = ['Show HN', 'Launch', 'Tool', 'App', 'Open Source', 'GPT', 'LLM']
-                count = 0
-                for i in ids:
-                    if count >= 15: break 
-                    item = self.fetch(f"https://hacker-news.firebaseio.co/v0/item/{i}.json").json()
-                    if not item: continue
-                    t = item.get('title', '')
-                    if t in self.seen_titles: continue
-                    if any(k in t for k in keys):
-                        url = item.get('url', f"https://news.ycombinator.com/item?id={i}")
-                        # Hacker News 必须深挖，否则只有标题
-                        rich_desc = self.get_smart_summary(url, t)
-                        
-                        self.news.append({
-                            "id": str(len(self.news)), "src": "Hacker News", "type": "DEV",
-                            "title": self.smart_trans(t),
-                            "desc": rich_desc,
-                            "url": url, "time": self.parse_time(item.get('time', 0), True)
-                        })
-                        self.seen_titles.add(t)
-                        count += 1
-                        print("💻", end="", flush=True)
-            except: pass
+        self.previous = self.load_previous() if self.incremental else {}
+        self.reused = 0
+        self.made = []  # 本次新构建的 (job, 条目)，翻译与写入去重索引留到构建阶段之后
+        from concurrent.futures import ThreadPoolExecutor
+        self.warm_up()
+        self.deadline = time.monotonic() + self.deadline_secs
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        # 每个数据源一个调度线程，只负责等待与解析；所有网络请求都提交到共享的 self.pool
+        runner = ThreadPoolExecutor(max_workers=max(1, len(self.sources)))
+        self.source_starts = [time.monotonic()] * len(self.sources)
+        try:
+            # 1) 各源并发拉取列表 2) 按优先级统一去重 (在深挖与翻译之前) 3) 各源并发构建
+            collected = self.run_phase(runner, self.collect_source, [None] * len(self.sources))
+            accepted = self.dedup_candidates(collected)
+            built = self.run_phase(runner, self.build_source, accepted)
+            self.translate_items(self.made)
+        finally:
+            runner.shutdown(wait=False, cancel_futures=True)
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+            self.deadline = None
+            self.trans_cache.save()
+            self.http_cache.save()
+            self.dedup.save()
+
+        # 按优先级合并 (同优先级保持注册顺序)
+        for k in sorted(range(len(self.sources)), key=lambda k: self.sources[k].priority):
+            for item in built[k]:
+                if self.add_news(item): print(self.sources[k].icon, end="", flush=True)
         print("")
+        st = self.trans_cache.stats
+        print(f"   └─ 翻译缓存: 命中 {st['hit']} / 未命中 {st['miss']} / 翻译请求 {st['calls']} 次")
+        hs = self.http_cache.stats
+        print(f"   └─ HTTP 缓存: 直接命中 {hs['fresh']} / 304 复用 {hs['revalidated']} / 摘要复用 {hs['summary']} / 未缓存 {hs['miss']} (省下 {hs['saved_bytes'] // 1024} KB)")
+        if self.incremental: self.merge_previous()
         if len(self.news) < 40: self.inject_filler(40 - len(self.news))
 
+    def run_phase(self, runner, fn, args):
+        """每个数据源在调度线程里执行 fn(k, source, arg)，失败或超时的源返回空列表"""
+        futures = [runner.submit(self.with_budget, k, fn, arg) for k, arg in enumerate(args)]
+        results = []
+        for source, f in zip(self.sources, futures):
+            # 到总时限时 gather 会立即放弃未完成的任务，留一点余量让已完成的条目交回来
+            try: results.append(f.result(timeout=self.time_left() + PHASE_GRACE))
+            except Exception as e:
+                print(f"\n⚠️ 数据源 {source.name} 失败: {e!r}")
+                results.append([])
+        return results
+
+    def with_budget(self, k, fn, arg):
+        """source.budget 从该源开始拉取时起算，跨越拉取与构建两个阶段"""
+        source = self.sources[k]
+        _thread_local.deadline = self.source_starts[k] + source.budget
+        try: return fn(k, source, arg)
+        finally: _thread_local.deadline = None
+
+    def collect_source(self, k, source, _):
+        self.source_starts[k] = time.monotonic()
+        _thread_local.deadline = self.source_starts[k] + source.budget
+        return list(source.parse(self, source.fetch(self)))
+
+    def dedup_candidates(self, collected):
+        """
+        按优先级逐个检查候选：本次已收录的相同标题、相同链接或近似标题直接丢弃；
+        与往日处理过的故事近似时复用当时的结果，省掉深挖和翻译。每个源取前 cap 条。
+        """
+        run_index = DedupIndex()
+        accepted = [[] for _ in self.sources]
+        near, carried = 0, 0
+        for k in sorted(range(len(self.sources)), key=lambda k: self.sources[k].priority):
+            source = self.sources[k]
+            for url, title, args in collected[k]:
+                if len(accepted[k]) >= source.cap: break
+                if title in self.seen_titles: continue
+                tokens, curl = title_tokens(title), canonical_url(url)
+                if run_index.match(tokens, curl) is not None:
+                    near += 1
+                    continue
+                nid = make_id(url)
+                # 往日条目会被整条沿用 (链接、标题、摘要)，因此只认同站点且更接近的标题
+                past = self.dedup.match(tokens, curl, DEDUP_PAST_THRESHOLD, same_host=True)
+                reuse = self.dedup.get(past) if past is not None else None
+                if reuse is not None: carried += 1
+                self.seen_titles.add(title)
+                run_index.add(nid, tokens, curl)
+                accepted[k].append({"id": nid, "args": args, "tokens": tokens, "url": curl,
+                                    "past": past, "reuse": reuse})
+        if near or carried: print(f"   └─ 近似去重: 本次重复 {near} 条，复用往日结果 {carried} 条")
+        if self.metrics:
+            self.metrics.count("dedup.near", near)
+            self.metrics.count("dedup.carried", carried)
+        return accepted
+
+    def build_source(self, k, source, jobs):
+        start = time.monotonic()
+        items = self.build_items(source, jobs)
+        if self.time_left() == 0:
+            print(f"\n⚠️ 数据源 {source.name} 超出时间预算 ({source.budget}s)，保留已完成的 {len(items)}/{len(jobs)} 条")
+            if self.metrics: self.metrics.count(f"source.{source.name}.over_budget")
+        if self.metrics:
+            self.metrics.observe(f"source.{source.name}", time.monotonic() - self.source_starts[k])
+            self.metrics.observe(f"source.{source.name}.build", time.monotonic() - start)
+            self.metrics.count(f"source.{source.name}.items", len(items))
+        return items
+
+    def rebuild(self):
+        """离线重建：读回 data.js 中的新闻，按保留期裁剪、不足时补位，全程不联网"""
+        print("   └─ 离线重建 (不联网)...")
+        self.news = []
+        self.seen_titles.clear()
+        self.previous = self.load_previous()
+        self.reused = 0
+        self.merge_previous()
+        if len(self.news) < 40: self.inject_filler(40 - len(self.news))
+
+    def add_news(self, item):
+        """按最终顺序写入；同一链接 (相同 id) 只保留先出现的一条"""
+        if any(n["id"] == item["id"] for n in self.news): return False
+        self.news.append(item)
+        return True
+
+    def load_previous(self):
+        data = load_data_file()
+        if not data: return {}
+        now = int(time.time())
+        previous = {}
+        for item in data.get("news", []):
+            # 旧版 data.js 的 id 是位置序号，这里统一按链接重算
+            item["id"] = make_id(item.get("url"))
+            item.setdefault("seen", now)
+            previous.setdefault(item["id"], item)
+        return previous
+
+    def merge_previous(self):
+        """把仍在保留期内、本次没有再出现的旧条目接在新条目后面"""
+        cutoff = time.time() - NEWS_RETENTION_DAYS * 86400
+        kept = 0
+        for item in self.previous.values():
+            if len(self.news) >= MAX_NEWS: break
+            if item["seen"] < cutoff: continue
+            if self.add_news(item): kept += 1
+        print(f"   └─ 增量合并: 复用 {self.reused} 条，保留历史 {kept} 条")
+
+    def build_items(self, source, jobs):
+        """
+        jobs 来自 dedup_candidates。增量模式下见过的 id 复用上次的条目，与往日故事近似的复用
+        去重索引里保存的条目，其余并发构建，翻译留给 translate_items。返回保持 jobs 顺序的条目列表。
+        """
+        previous = [self.previous.get(job["id"]) for job in jobs]
+        # 兜底条目和 partial 条目 (摘要或翻译临时失败) 不复用，重新构建 (保留首次收录时间)
+        out = [prev if prev and not (prev.get("fallback") or prev.get("partial")) else job["reuse"]
+               for prev, job in zip(previous, jobs)]
+        with self.host_lock: self.reused += sum(1 for item in out if item is not None)
+        for job, item in zip(jobs, out):
+            if item is not None and job["past"] is not None: self.dedup.touch(job["past"])
+        todo = [k for k, item in enumerate(out) if item is None]
+        now = int(time.time())
+        made = []
+        def builder(*args):
+            _thread_local.partial = False
+            item = source.build(self, *args)
+            if item is not None and _thread_local.partial: item["partial"] = True
+            return item
+        for k, item in zip(todo, self.gather(builder, [jobs[k]["args"] for k in todo])):
+            if item is None:
+                item = source.fallback(self, *jobs[k]["args"])
+                if item is not None: item["fallback"] = True
+            if item is None: continue
+            item["id"] = jobs[k]["id"]
+            item["seen"] = previous[k]["seen"] if previous[k] else now
+            out[k] = item
+            made.append((jobs[k], item))
+        with self.host_lock: self.made += made
+        return [item for item in out if item is not None]
+
+    def translate_items(self, made):
+        """
+        构建阶段结束后统一执行：标题和抓到的摘要一起送进批量翻译 (没抓到摘要时沿用原标题)，翻译失败的条目标记 partial。
+        只有摘要抓到且标题、摘要都翻译成功的条目才写入持久化去重索引，之后标题稍有变化也能直接复用。
+        """
+        slots, complete = [], []
+        for _, item in made:
+            slots.append((item, "title"))
+            found = item.pop("_trans_desc", True)
+            if found: slots.append((item, "desc"))
+            complete.append(found and not item.get("fallback") and not item.get("partial"))
+        missed = []
+        results = self.translate_many([item[key] for item, key in slots], missed)
+        for (item, key), text in zip(slots, results): item[key] = text
+        for idx in missed: slots[idx][0]["partial"] = True
+        for (job, item), ok in zip(made, complete):
+            if ok and not item.get("partial"): self.dedup.add(job["id"], job["tokens"], job["url"], item)
+
     # === 🌟 升级：深度点评备用库 ===
     # 当爬虫失败时，这些丰富的内容会顶上去
     def inject_filler(self, count):
@@ -260,15 +1353,18 @@ class DataEngine:
         # 循环填充直到满足数量
         full_filler = filler_db * 5
         added = 0
+        now = int(time.time())
         for item in full_filler:
             if added >= count: break
             if item['title'] in self.seen_titles: continue
-            self.news.append({
-                "id": str(len(self.news)), "src": item['src'], "type": item['type'],
-                "title": item['title'], "desc": item['desc'], "url": item['url'], "time": current_time
-            })
             self.seen_titles.add(item['title'])
+            if not self.add_news({
+                "id": make_id(item['url']), "src": item['src'], "type": item['type'],
+                "title": item['title'], "desc": item['desc'], "url": item['url'], "time": current_time,
+                "seen": now
+            }): continue
             added += 1
+        if self.metrics and added: self.metrics.count("filler", added)
 
     def make_ranks(self):
         print("   └─ 生成 Top 20 深度榜单...")
@@ -279,13 +1375,40 @@ class DataEngine:
             "Dev": [("Cursor", "AI 原生编辑器，全库理解。", "https://cursor.com"), ("GitHub Copilot", "开发者必备代码补全。", "https://github.com/features/copilot"), ("v0.dev", "文字生成 React 界面。", "https://v0.dev"), ("Replit", "全自动构建 Web 应用。", "https://replit.com"), ("Hugging Face", "全球开源模型托管中心。", "https://huggingface.co"), ("LangChain", "LLM 应用开发框架。", "https://www.langchain.com"), ("Ollama", "本地运行大模型工具。", "https://ollama.com"), ("Supermaven", "超长记忆代码补全，速度快。", "https://supermaven.com"), ("Codeium", "免费强大的代码补全。", "https://codeium.com"), ("Devin", "全自动 AI 软件工程师。", "https://www.cognition-labs.com/devin"), ("Gradio", "Python 构建 AI 演示界面。", "https://www.gradio.app"), ("Streamlit", "数据仪表盘开发框架。", "https://streamlit.io"), ("Dify", "可视化 LLM 应用编排。", "https://dify.ai"), ("Coze", "零代码 AI Bot 搭建。", "https://www.coze.com"), ("Pinecone", "AI 向量数据库。", "https://www.pinecone.io"), ("Vercel", "前端托管，支持 AI 应用。", "https://vercel.com"), ("Tabnine", "私有化代码补全。", "https://www.tabnine.com"), ("Amazon Q", "AWS 开发者助手。", "https://aws.amazon.com/q/developer/"), ("W&B", "模型训练监控平台。", "https://wandb.ai"), ("LlamaIndex", "LLM 数据连接框架。", "https://www.llamaindex.ai")]
         }
         self.ranks = {}
+        # 抖动按日期取种子：同一天内重复运行得到相同分数，data.js 不会无故变化
+        rng = random.Random(get_beijing_now().strftime("%Y-%m-%d"))
         for cat, items in data.items():
             lst = []
             for i, (name, desc, url) in enumerate(items):
-                score = 99.9 - (i * 0.5) + random.uniform(-0.1, 0.1)
+                score = 99.9 - (i * 0.5) + rng.uniform(-0.1, 0.1)
                 lst.append({"rank": i+1, "name": name, "desc": desc, "url": url, "score": f"{score:.1f}"})
             self.ranks[cat] = lst
 
+    def record_history(self, path=HISTORY_FILE):
+        """把本次榜单和新闻写入历史库，并把名次变化 / 连续在榜 / 新上榜标到榜单条目上"""
+        day = day_number()
+        try:
+            history = History(path)
+        except sqlite3.Error as e:
+            print(f"⚠️ 历史库打开失败: {e}")
+            return
+        try:
+            history.record(day, self.ranks, self.news)
+            stats = history.rank_stats(day)
+            fresh = history.new_news(day)
+        except sqlite3.Error as e:
+            print(f"⚠️ 历史库写入失败: {e}")
+            return
+        finally:
+            history.close()
+        for items in self.ranks.values():
+            for item in items:
+                delta, streak, new = stats.get(item["name"], (None, 1, False))
+                if delta: item["delta"] = delta
+                item["streak"] = streak
+                if new: item["new"] = True
+        print(f"   └─ 历史快照: 本周新增新闻 {len(fresh)} 条")
+
     def make_prompts(self):
         print("   └─ 构建 AI 万能公式库...")
         self.prompts = [
@@ -305,21 +1428,247 @@ class DataEngine:
 
     def save(self):
         final_data = {'news': self.news, 'ranks': self.ranks, 'prompts': self.prompts}
-        js = f"window.AI_DATA = {json.dumps(final_data, ensure_ascii=False, indent=2)};"
+        js = f"{DATA_PREFIX}{json.dumps(final_data, ensure_ascii=False, indent=2)};"
+        try:
+            # 内容没变就不重写，避免 Actions 产生空提交
+            with open(DATA_FILE, "r", encoding="utf-8") as f: unchanged = f.read() == js
+        except OSError: unchanged = False
+        if unchanged:
+            print(f"✅ [{get_beijing_now().strftime('%m-%d %H:%M')}] 数据无变化，跳过写入 (新闻:{len(self.news)})")
+            return
         try:
             with open(DATA_FILE, "w", encoding="utf-8") as f: f.write(js)
             print(f"✅ [{get_beijing_now().strftime('%m-%d %H:%M')}] 数据更新完成 (新闻:{len(self.news)}, 提示词:{len(self.prompts)})")
         except PermissionError:
             print("❌ 写入失败：文件被占用，请关闭正在打开 data.js 的程序。")
 
-if __name__ == "__main__":
+    def save_split(self, out_dir=SPLIT_DIR):
+        """
+        分片输出：news / 每个榜单分类 / prompts 各自一个压缩 JSON，
+        文件名带内容哈希，并附带 .gz/.br 预压缩文件。页面先读 manifest.json，
+        拿到新闻分片即可交互。data.js 仍照常生成，供增量模式和本地打开使用。
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        brotli = load_brotli()
+        written = 0
+
+        def put(prefix, payload):
+            nonlocal written
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            name = shard_name(prefix, body)
+            path = os.path.join(out_dir, name)
+            if write_if_changed(path, body):
+                written += 1
+                # mtime 固定为 0，保证同样内容压缩出的字节完全一致
+                write_if_changed(path + ".gz", gzip.compress(body, 9, mtime=0))
+                if brotli: write_if_changed(path + ".br", brotli.compress(body))
+            return name
+
+        manifest = {
+            "updated": self.news[0]["time"] if self.news else get_beijing_now().strftime("%m-%d %H:%M"),
+            "news": put("news", self.news),
+            "ranks": [{"name": cat, "file": put(f"ranks-{cat}", items)} for cat, items in self.ranks.items()],
+            "prompts": put("prompts", self.prompts),
+            "search": put("search", build_search_index(self.news)),
+        }
+        body = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        write_if_changed(os.path.join(out_dir, MANIFEST_FILE), body)
+
+        # 清理不再被 manifest 引用的旧分片
+        live = {manifest["news"], manifest["prompts"], manifest["search"]} | {r["file"] for r in manifest["ranks"]}
+        for name in os.listdir(out_dir):
+            base = re.sub(r'\.(gz|br)$', '', name)
+            if base != MANIFEST_FILE and base.endswith(".json") and base not in live:
+                try: os.remove(os.path.join(out_dir, name))
+                except OSError: pass
+        print(f"✅ 分片输出完成: {out_dir}/ (新写入 {written} 个分片)")
+
+# === 数据源插件 ===
+class Source:
+    """
+    数据源插件基类。子类实现：
+      fetch(engine)            拉取列表，返回原始响应 (在调度线程内执行)；
+                               用 engine.fetch(url, kind=...) 时 kind 决定缓存有效期 (见 HTTP_CACHE_TTL)
+      parse(engine, raw)       按顺序产出候选 (链接, 原始标题, build 参数)，引擎去重后取前 cap 条
+      build(engine, *args)     在共享线程池中构建单条新闻 (抓摘要，不翻译)
+      fallback(engine, *args)  build 超时或失败时的兜底条目，默认丢弃
+    build / fallback 返回的条目里，标题总会被翻译；"_trans_desc" 为 False 时 desc 保留原文
+    (没抓到摘要、desc 只是原标题的情况)，缺省为 True。兜底条目带 "fallback" 标记，下次重新构建。
+    priority 越小合并时越靠前；budget 为该源的总时间预算 (秒)，超出后未完成的任务被取消。
+    """
+    name = "source"
+    icon = "📰"
+    cap = 15
+    budget = 60
+    priority = 100
+
+    def fetch(self, engine):
+        return None
+
+    def parse(self, engine, raw):
+        return []
+
+    def build(self, engine, *args):
+        return None
+
+    def fallback(self, engine, *args):
+        return None
+
+class AtomFeedSource(Source):
+    """通用 Atom feed：自带摘要太短时去原文深挖"""
+    src = "RSS"
+    type = "APP"
+
+    def __init__(self, name, url, src=None, type=None, icon=None, cap=None, budget=None, priority=None):
+        self.name = name
+        self._url = url
+        for key, value in (("src", src), ("type", type), ("icon", icon), ("cap", cap), ("budget", budget), ("priority", priority)):
+            if value is not None: setattr(self, key, value)
+
+    @property
+    def url(self):
+        return self._url
+
+    def fetch(self, engine):
+        return engine.fetch(self.url, kind="feed")
+
+    def parse(self, engine, r):
+        if not (r and r.status_code == 200): return
+        import xml.etree.ElementTree as ET
+        seen = set()
+        try:
+            root = ET.fromstring(r.content)
+            ns = {'atom': 'http://www.w3.org/2005/Atom'}
+            entries = root.findall('atom:entry', ns) or root.findall('{http://www.w3.org/2005/Atom}entry')
+        except ET.ParseError: return
+        for entry in entries:
+            try:
+                title = (entry.find('atom:title', ns) or entry.find('{http://www.w3.org/2005/Atom}title')).text
+                if title in seen: continue
+                summary = (entry.find('atom:summary', ns) or entry.find('{http://www.w3.org/2005/Atom}summary')).text
+                link = (entry.find('atom:link', ns) or entry.find('{http://www.w3.org/2005/Atom}link')).attrib['href']
+                pub = (entry.find('atom:published', ns) or entry.find('{http://www.w3.org/2005/Atom}published')).text
+                seen.add(title)
+                yield link, title, (title, summary, link, pub)
+            except (AttributeError, KeyError): continue
+
+    def build(self, engine, title, summary, link, pub):
+        # 如果自带摘要太短，也尝试深挖一下
+        final_desc, found = summary, True
+        if len(summary) < 30:
+            final_desc, found = engine.extract_summary(link, title)
+        return {
+            "src": self.src, "type": self.type,
+            "title": title, "desc": final_desc, "_trans_desc": found,
+            "url": link, "time": engine.parse_time(pub)
+        }
+
+class ProductHuntSource(AtomFeedSource):
+    def __init__(self):
+        super().__init__("producthunt", None, src="Product Hunt", type="APP", icon="📱", priority=10)
+
+    @property
+    def url(self):
+        return PH_FEED_URL
+
+class HackerNewsSource(Source):
+    name = "hackernews"
+    icon = "💻"
+    budget = 90
+    priority = 20
+    scan = 60  # 扫描 topstories 的前 60 条
+    keys = ['Show HN', 'Launch', 'Tool', 'App', 'Open Source', 'GPT', 'LLM']
+
+    def fetch(self, engine):
+        return engine.fetch(f"{HN_API_BASE}/topstories.json", kind="feed")
+
+    def parse(self, engine, r):
+        if not (r and r.status_code == 200): return
+        try: ids = r.json()[:self.scan]
+        except ValueError: return
+        # item 请求一次性并发，筛选时再按榜单顺序产出
+        items = engine.gather(engine.fetch_json, [(f"{HN_API_BASE}/item/{i}.json", "hn_item") for i in ids])
+        seen = set()
+        for i, item in zip(ids, items):
+            if not item: continue
+            t = item.get('title', '')
+            if t in seen: continue
+            if any(k in t for k in self.keys):
+                seen.add(t)
+                yield self.item_url(i, item), t, (i, item)
+
+    @staticmethod
+    def item_url(i, item):
+        return item.get('url', f"{HN_ITEM_PAGE}{i}")
+
+    def build(self, engine, i, item):
+        t = item.get('title', '')
+        url = self.item_url(i, item)
+        # Hacker News 必须深挖，否则只有标题
+        rich_desc, found = engine.extract_summary(url, t)
+        return {
+            "src": "Hacker News", "type": "DEV",
+            "title": t, "desc": rich_desc, "_trans_desc": found,
+            "url": url, "time": engine.parse_time(item.get('time', 0), True)
+        }
+
+    def fallback(self, engine, i, item):
+        # 超过时间预算时保留原始标题，不丢条目
+        t = item.get('title', '')
+        return {
+            "src": "Hacker News", "type": "DEV", "title": t, "desc": t, "_trans_desc": False,
+            "url": self.item_url(i, item), "time": engine.parse_time(item.get('time', 0), True)
+        }
+
+# 注册表：新增数据源 (更多 RSS/Atom、GitHub Trending、arXiv 等) 只需往这里追加实例，例如
+#   AtomFeedSource("arxiv-ai", "https://export.arxiv.org/api/query?search_query=cat:cs.AI", src="arXiv", type="DEV", icon="📄", priority=30)
+SOURCES = [ProductHuntSource(), HackerNewsSource()]
+
+# === 命令行入口 ===
+def build_parser():
+    parser = argparse.ArgumentParser(prog="engine.py", description="AI Nexus 数据引擎")
+    sub = parser.add_subparsers(dest="command")
+    p_run = sub.add_parser("run", help="完整运行：抓取、翻译并生成数据 (默认)")
+    p_run.add_argument("--incremental", action="store_true", help="增量模式：合并上次的 data.js，只处理新条目")
+    p_run.add_argument("--workers", type=int, default=MAX_WORKERS, help=f"并发数 (默认 {MAX_WORKERS})")
+    sub.add_parser("rebuild", help="离线重建：从现有 data.js 按保留期重建全部输出，不联网")
+    sub.add_parser("ranks", help="只重新生成榜单与提示词，新闻原样保留，不联网")
+    for p in sub.choices.values():
+        p.add_argument("--split", action="store_true", help=f"同时输出分片与 manifest ({SPLIT_DIR}/，该目录已有 manifest 时总会刷新)")
+        p.add_argument("--report", action="store_true", help="写出运行报告 run_report.json")
+        p.add_argument("--report-prom", action="store_true", help="额外写出 Prometheus 格式报告")
+        p.add_argument("--no-history", action="store_true", help=f"不写入历史快照 ({HISTORY_FILE})")
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # 兼容旧用法：不带子命令 (或只带选项) 时等同于 run
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")): argv = ["run"] + argv
+    args = build_parser().parse_args(argv)
     try:
-        e = DataEngine()
-        e.run_spider()
+        if args.command == "run":
+            print("🔄 正在初始化 AI Nexus 引擎 (内容深度增强版)...")
+            e = DataEngine(workers=args.workers, incremental=args.incremental, metrics=args.report or args.report_prom)
+            e.run_spider()
+        else:
+            e = DataEngine(metrics=args.report or args.report_prom)
+            if args.command == "rebuild": e.rebuild()
+            # 新闻原样保留，只按链接重算 id (旧版 data.js 的 id 是位置序号，写进历史库会跨天冲突)
+            else: e.news = list(e.load_previous().values())
         e.make_ranks()
         e.make_prompts()
+        if not args.no_history: e.record_history()
         e.save()
+        # 页面优先读 manifest：已经有分片时即使没带 --split 也要刷新，否则页面会显示旧数据
+        if args.split or os.path.exists(os.path.join(SPLIT_DIR, MANIFEST_FILE)): e.save_split()
+        e.write_report(prom=args.report_prom)
     except Exception as e:
         print(f"出错: {e}")
         traceback.print_exc()
-    print("✨ 脚本运行结束，3秒后退出...")
+        return 1
+    finally:
+        print("✨ 脚本运行结束，3秒后退出...")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())